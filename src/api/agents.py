@@ -1,5 +1,6 @@
 """Combined healthcare agents API router."""
 
+from functools import lru_cache
 from fastapi import APIRouter, Query, Depends
 from services.agent_services import (
     PatientService, MedicationService, FollowupService, ConditionService,
@@ -7,81 +8,42 @@ from services.agent_services import (
 )
 from services.bedrock_service import BedrockService
 from services.database_operation_service import DatabaseOperationService
+from services.shared_services import get_shared_bedrock_service, get_shared_db_ops_service
 from schemas.healthcare import HealthcareQueryResponse
 from typing import List, Dict, Any
 from schemas.database_operations import QueryExecutionResponse
 from db.session import get_database_manager
 
+# Agent services only hold the shared services, so they are shared per DatabaseManager too
+@lru_cache(maxsize=None)
+def _shared_agent_service(service_cls, db_manager):
+    return service_cls(db_manager, get_shared_bedrock_service(db_manager), get_shared_db_ops_service(db_manager))
+
 # Base service dependencies
-def get_bedrock_service(db_manager=Depends(get_database_manager)) -> BedrockService:
-    return BedrockService(db_manager)
+async def get_bedrock_service(db_manager=Depends(get_database_manager)) -> BedrockService:
+    return get_shared_bedrock_service(db_manager)
 
-def get_db_ops_service(db_manager=Depends(get_database_manager)) -> DatabaseOperationService:
-    return DatabaseOperationService(db_manager)
+async def get_db_ops_service(db_manager=Depends(get_database_manager)) -> DatabaseOperationService:
+    return get_shared_db_ops_service(db_manager)
 
 # Healthcare service dependencies
-def get_patient_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> PatientService:
-    return PatientService(db_manager, bedrock_service, db_ops_service)
-
-def get_medication_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> MedicationService:
-    return MedicationService(db_manager, bedrock_service, db_ops_service)
-
-def get_followup_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> FollowupService:
-    return FollowupService(db_manager, bedrock_service, db_ops_service)
-
-def get_condition_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> ConditionService:
-    return ConditionService(db_manager, bedrock_service, db_ops_service)
-
-def get_lab_result_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> LabResultService:
-    return LabResultService(db_manager, bedrock_service, db_ops_service)
-
-def get_procedure_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> ProcedureService:
-    return ProcedureService(db_manager, bedrock_service, db_ops_service)
-
-def get_allergy_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> AllergyService:
-    return AllergyService(db_manager, bedrock_service, db_ops_service)
-
-def get_appointment_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> AppointmentService:
-    return AppointmentService(db_manager, bedrock_service, db_ops_service)
-
-def get_diet_service(
-    db_manager=Depends(get_database_manager),
-    bedrock_service=Depends(get_bedrock_service),
-    db_ops_service=Depends(get_db_ops_service)
-) -> DietService:
-    return DietService(db_manager, bedrock_service, db_ops_service)
+def _make_provider(service_cls):
+    """Build the FastAPI dependency that returns the shared service_cls instance."""
+    async def provider(db_manager=Depends(get_database_manager)):
+        return _shared_agent_service(service_cls, db_manager)
+    provider.__name__ = f"get_{service_cls.__name__}"
+    provider.__annotations__["return"] = service_cls
+    return provider
+
+get_patient_service = _make_provider(PatientService)
+get_medication_service = _make_provider(MedicationService)
+get_followup_service = _make_provider(FollowupService)
+get_condition_service = _make_provider(ConditionService)
+get_lab_result_service = _make_provider(LabResultService)
+get_procedure_service = _make_provider(ProcedureService)
+get_allergy_service = _make_provider(AllergyService)
+get_appointment_service = _make_provider(AppointmentService)
+get_diet_service = _make_provider(DietService)
 
 router = APIRouter()
 
@@ -1,52 +1,38 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+import httpx
+from fastapi import APIRouter, Depends, Request
 from services.cerner import generate_cerner_diagnosis_summary, generate_cerner_medication_summary, generate_cerner_patient_summary, generate_cerner_lab_summary, generate_cerner_followup_summary, generate_procedure_summary, generate_allergy_summary, generate_upcoming_cappointment_summary, generate_nutrition_summary, get_diet, risk, generate_aftercare_summary, generate_vitals_summary
 from schemas.schema import PatientSummary
 router = APIRouter()
 
-@router.get("/Patient-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_summary_patient(patient_id: str,organization: str):
-    return await generate_cerner_patient_summary(patient_id,organization)
-
-@router.get("/medications-agent/{organization}/{patient_id}",  tags=["CERNER"])
-async def generate_summary_medication(patient_id: str,organization: str):
-    return await generate_cerner_medication_summary(patient_id,organization)
-
-@router.get("/conditions-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_summary_diagnosis(patient_id: str,organization: str):
-    return await generate_cerner_diagnosis_summary(patient_id,organization)
-
-@router.get("/follow-up-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_summary_followup(patient_id: str,organization: str):
-    return await generate_cerner_followup_summary(patient_id,organization)
-
-@router.get("/labresult-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_summary_lab(patient_id: str,organization: str):
-    print(patient_id)
-    return await generate_cerner_lab_summary(patient_id,organization)
-
-@router.get("/Procedure-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_Procedure_summary(patient_id: str,organization: str):
-    return await generate_procedure_summary(patient_id,organization)
-
-@router.get("/Allergy-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_allergy(patient_id: str,organization: str):
-    return await generate_allergy_summary(patient_id,organization)
-@router.get("/upcoming-appointment/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_agent_Response_followup(patient_id: str,organization: str):
-    return await generate_upcoming_cappointment_summary(patient_id, organization)
-@router.get("/nutrition/{organization}/{patient_id}", response_model=PatientSummary, tags=["CERNER"])
-async def generate_agent_Response_nutrition(patient_id: str,organization: str):
-    return await generate_nutrition_summary(patient_id, organization)
-@router.get("/Diet/{organization}/{patient_id}", tags=["CERNER"])
-async def get_diet_data(patient_id: str,organization: str):
-    return await get_diet(patient_id, organization)
-@router.get("/Risk/{organization}/{patient_id}", tags=["CERNER"])
-async def riskpanel(patient_id: str,organization: str):
-    return await risk(patient_id, organization)
-@router.get("/aftercare/{organization}/{patient_id}", tags=["CERNER"])
-async def aftercare(patient_id: str,organization: str):
-    return await generate_aftercare_summary(patient_id, organization)
-@router.get("/cerner-vitals-agent/{organization}/{patient_id}", tags=["CERNER"])
-async def generate_vitals_summary_endpoint(patient_id: str, organization: str):
-    return await generate_vitals_summary(patient_id, organization)
+
+async def get_cerner_client(request: Request) -> httpx.AsyncClient:
+    """Shared Cerner FHIR client created in the application lifespan."""
+    return request.app.state.cerner_client
+
+
+# (path, route name, service handler, response model) for each per-patient Cerner agent
+CERNER_AGENT_ROUTES = [
+    ("/Patient-agent/{organization}/{patient_id}", "generate_summary_patient", generate_cerner_patient_summary, PatientSummary),
+    ("/medications-agent/{organization}/{patient_id}", "generate_summary_medication", generate_cerner_medication_summary, None),
+    ("/conditions-agent/{organization}/{patient_id}", "generate_summary_diagnosis", generate_cerner_diagnosis_summary, PatientSummary),
+    ("/follow-up-agent/{organization}/{patient_id}", "generate_summary_followup", generate_cerner_followup_summary, PatientSummary),
+    ("/labresult-agent/{organization}/{patient_id}", "generate_summary_lab", generate_cerner_lab_summary, PatientSummary),
+    ("/Procedure-agent/{organization}/{patient_id}", "generate_Procedure_summary", generate_procedure_summary, PatientSummary),
+    ("/Allergy-agent/{organization}/{patient_id}", "generate_allergy", generate_allergy_summary, PatientSummary),
+    ("/upcoming-appointment/{organization}/{patient_id}", "generate_agent_Response_followup", generate_upcoming_cappointment_summary, PatientSummary),
+    ("/nutrition/{organization}/{patient_id}", "generate_agent_Response_nutrition", generate_nutrition_summary, PatientSummary),
+    ("/Diet/{organization}/{patient_id}", "get_diet_data", get_diet, None),
+    ("/Risk/{organization}/{patient_id}", "riskpanel", risk, None),
+    ("/aftercare/{organization}/{patient_id}", "aftercare", generate_aftercare_summary, None),
+    ("/cerner-vitals-agent/{organization}/{patient_id}", "generate_vitals_summary_endpoint", generate_vitals_summary, None),
+]
+
+
+def _agent_endpoint(handler):
+    async def endpoint(patient_id: str, organization: str, client: httpx.AsyncClient = Depends(get_cerner_client)):
+        return await handler(patient_id, organization, client)
+    return endpoint
+
+
+for path, name, handler, response_model in CERNER_AGENT_ROUTES:
+    router.add_api_route(path, _agent_endpoint(handler), methods=["GET"], name=name, response_model=response_model, tags=["CERNER"])
@@ -51,7 +51,6 @@ async def cerner_authorize(organization: str = Query(...)):
 def cerner_callback(code: str, state: str):
     try:
         organization = get_organization(state)
-        print("organizationn", organization)
 
         cerner_tokens = exchange_code_for_cerner_tokens(code, organization)
 
@@ -77,7 +76,6 @@ def cerner_refresh(organization: str = Query(...)):
     """
     Step 3: Refresh the access token using the refresh token.
     """
-    print("organization", organization)
     cerner_tokens = refresh_cerner_access_token(organization)
     return {"message": "Access token refreshed", "tokens": cerner_tokens}
  
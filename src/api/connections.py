@@ -22,7 +22,7 @@ router = APIRouter(
 )
 
 
-def get_connection_service(db_manager: DatabaseManager = Depends(get_database_manager)) -> ConnectionService:
+async def get_connection_service(db_manager: DatabaseManager = Depends(get_database_manager)) -> ConnectionService:
     """Dependency to get connection service."""
     if not db_manager.is_connected():
         raise HTTPException(
@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException, Depends, Path, Query
 
 from services.connection_service import ConnectionService
 from services.database_operation_service import DatabaseOperationService  
+from services.shared_services import get_shared_db_ops_service
 from db.session import get_database_manager, DatabaseManager
 from schemas.database_operations import DatabaseQueryResult
 
@@ -22,13 +23,13 @@ class PatientDashboardController:
         self.router = APIRouter()
         self._setup_routes()
     
-    def get_connection_service(self, db_manager: DatabaseManager = Depends(get_database_manager)) -> ConnectionService:
+    async def get_connection_service(self, db_manager: DatabaseManager = Depends(get_database_manager)) -> ConnectionService:
         """Dependency to get connection service."""
         return ConnectionService(db_manager)
 
-    def get_database_operation_service(self, db_manager: DatabaseManager = Depends(get_database_manager)) -> DatabaseOperationService:
+    async def get_database_operation_service(self, db_manager: DatabaseManager = Depends(get_database_manager)) -> DatabaseOperationService:
         """Dependency to get database operation service."""  
-        return DatabaseOperationService(db_manager)
+        return get_shared_db_ops_service(db_manager)
     
     def _setup_routes(self):
         """Setup routes for patient dashboard endpoints."""
@@ -1,57 +1,60 @@
-from fastapi import APIRouter
-from schemas.schema import PatientSummary, PatientRequest
-from services.epic import generate_patient_summary, generate_Followup_summary, generate_medication_summary, generate_condition_summary, generate_lab_summary, generate_procedure_summary, generate_allergy_summary, generate_upcoming_appointment_summary, generate_nutrition_summary, get_diet, risk, generate_aftercare_summary, fetch_epic_observations, generate_vitals_summary
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request
+from schemas.schema import PatientSummary, PatientRequest, BatchPatientRequest
+from services.epic import generate_patient_summary, generate_Followup_summary, generate_medication_summary, generate_condition_summary, generate_lab_summary, generate_procedure_summary, generate_allergy_summary, generate_upcoming_appointment_summary, generate_nutrition_summary, get_diet, risk, generate_aftercare_summary, fetch_epic_observations, generate_vitals_summary, summarize_patients
 router = APIRouter()
-@router.get("/patient-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_patient_observ(patient_id: str,organization: str):
-    print(patient_id,organization)
-    return await generate_patient_summary(patient_id, organization)
 
-@router.get("/medication-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_medication(patient_id: str,organization: str):
-    return await generate_medication_summary(patient_id, organization)
 
-@router.get("/followup-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_agent_Response_followup(patient_id: str,organization: str):
-    return await generate_Followup_summary(patient_id, organization)
-
-@router.get("/condition-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_condition(patient_id: str,organization: str):
-    return await generate_condition_summary(patient_id, organization)
-
-@router.get("/lab-result-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_lab(patient_id: str,organization: str):
-    return await generate_lab_summary(patient_id, organization)
-
-@router.get("/procedure-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_procedure(patient_id: str,organization: str):
-    return await generate_procedure_summary(patient_id, organization)
-
-@router.get("/allergy-agent/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_allergy(patient_id: str,organization: str):
-    return await generate_allergy_summary(patient_id, organization)
-
-@router.get("/upcoming-epic-appointment/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_agent_Response_upcoming(patient_id: str,organization: str):
-    return await generate_upcoming_appointment_summary(patient_id, organization)
-
-@router.get("/epic_nutrition/{organization}/{patient_id}", response_model=PatientSummary, tags=["EPIC"])
-async def generate_agent_Response_nutrition(patient_id: str,organization: str):
-    return await generate_nutrition_summary(patient_id, organization)
-
-@router.get("/Epic-Diet/{organization}/{patient_id}", tags=["EPIC"])
-async def get_diet_data(patient_id: str,organization: str):
-    return await get_diet(patient_id, organization)
-
-
-@router.get("/Epic-Risk/{organization}/{patient_id}", tags=["EPIC"])
-async def riskpanel(patient_id: str,organization: str):
-    return await risk(patient_id, organization)
-
-@router.get("/Epic-aftercare/{organization}/{patient_id}", tags=["EPIC"])
-async def aftercare(patient_id: str,organization: str):
-    return await generate_aftercare_summary(patient_id, organization)
-
-@router.get("/vitals-agent/{organization}/{patient_id}", tags=["EPIC"])
-async def get_patient_vitals(patient_id: str, organization: str):
-    return await generate_vitals_summary(patient_id, organization)
+async def get_epic_client(request: Request) -> httpx.AsyncClient:
+    """Shared Epic FHIR client created in the application lifespan."""
+    return request.app.state.epic_client
+
+# (path, route name, service handler, response model) for each per-patient Epic agent
+EPIC_AGENT_ROUTES = [
+    ("/patient-agent/{organization}/{patient_id}", "generate_patient_observ", generate_patient_summary, PatientSummary),
+    ("/medication-agent/{organization}/{patient_id}", "generate_medication", generate_medication_summary, PatientSummary),
+    ("/followup-agent/{organization}/{patient_id}", "generate_agent_Response_followup", generate_Followup_summary, PatientSummary),
+    ("/condition-agent/{organization}/{patient_id}", "generate_condition", generate_condition_summary, PatientSummary),
+    ("/lab-result-agent/{organization}/{patient_id}", "generate_lab", generate_lab_summary, PatientSummary),
+    ("/procedure-agent/{organization}/{patient_id}", "generate_procedure", generate_procedure_summary, PatientSummary),
+    ("/allergy-agent/{organization}/{patient_id}", "generate_allergy", generate_allergy_summary, PatientSummary),
+    ("/upcoming-epic-appointment/{organization}/{patient_id}", "generate_agent_Response_upcoming", generate_upcoming_appointment_summary, PatientSummary),
+    ("/epic_nutrition/{organization}/{patient_id}", "generate_agent_Response_nutrition", generate_nutrition_summary, PatientSummary),
+    ("/Epic-Diet/{organization}/{patient_id}", "get_diet_data", get_diet, None),
+    ("/Epic-Risk/{organization}/{patient_id}", "riskpanel", risk, None),
+    ("/Epic-aftercare/{organization}/{patient_id}", "aftercare", generate_aftercare_summary, None),
+    ("/vitals-agent/{organization}/{patient_id}", "get_patient_vitals", generate_vitals_summary, None),
+]
+
+
+def _agent_endpoint(handler):
+    async def endpoint(patient_id: str, organization: str, client: httpx.AsyncClient = Depends(get_epic_client)):
+        return await handler(patient_id, organization, client)
+    return endpoint
+
+
+for path, name, handler, response_model in EPIC_AGENT_ROUTES:
+    router.add_api_route(path, _agent_endpoint(handler), methods=["GET"], name=name, response_model=response_model, tags=["EPIC"])
+
+# Agents that can be run for several patients in one request
+BATCH_AGENTS = {
+    "patient": generate_patient_summary,
+    "medication": generate_medication_summary,
+    "followup": generate_Followup_summary,
+    "condition": generate_condition_summary,
+    "lab-result": generate_lab_summary,
+    "procedure": generate_procedure_summary,
+    "allergy": generate_allergy_summary,
+    "upcoming-appointment": generate_upcoming_appointment_summary,
+    "nutrition": generate_nutrition_summary,
+    "diet": get_diet,
+    "risk": risk,
+    "aftercare": generate_aftercare_summary,
+}
+
+@router.post("/epic-batch/{agent}/{organization}", tags=["EPIC"])
+async def generate_batch(agent: str, organization: str, request: BatchPatientRequest, client: httpx.AsyncClient = Depends(get_epic_client)):
+    handler = BATCH_AGENTS.get(agent)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"Unknown agent: {agent}")
+    return await summarize_patients(handler, request.patient_ids, organization, client)
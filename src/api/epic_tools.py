@@ -28,7 +28,6 @@ async def epic_authorize(credentials: Credentials):
 async def authorize(organization: str):
 
     # Step 1: Redirect user to Epic's authorization page.
-    print(organization)
     auth_url = generate_epic_authorization_url(organization)
     return {"authorization_url": auth_url}
 
@@ -4,8 +4,7 @@ import re
 from fastapi import APIRouter, Query, HTTPException, Depends
 import json
 
-from services.bedrock_service import BedrockService
-from services.database_operation_service import DatabaseOperationService
+from services.shared_services import get_shared_bedrock_service, get_shared_db_ops_service
 from db.session import get_database_manager
 from schemas.healthcare import HealthcareQueryResponse
 from schemas.database_operations import QueryExecutionResponse
@@ -71,7 +70,7 @@ class HealthcareQueryController:
                 "database_name": schema_result.database_name
             }
             
-            bedrock_service = BedrockService(db_manager)
+            bedrock_service = get_shared_bedrock_service(db_manager)
             result = await bedrock_service.generate_healthcare_query(
                 connection_id=connection_id,
                 query_request=f"{query_type} healthcare query for patient {patient_id.strip()}",
@@ -100,7 +99,6 @@ class HealthcareQueryController:
             
             # Clean the query with regex
             response["generated_query"] = re.sub(r'\\"', '"', response["generated_query"]) 
-            print(response["generated_query"])
             return response
             
         except HTTPException:
@@ -169,7 +167,7 @@ class HealthcareQueryController:
                 "database_name": schema_result.database_name
             }
             
-            bedrock_service = BedrockService(db_manager)
+            bedrock_service = get_shared_bedrock_service(db_manager)
             query_result = await bedrock_service.generate_healthcare_query(
                 connection_id=connection_id,
                 query_request=f"{query_type} healthcare query for patient {patient_id.strip()}",
@@ -186,7 +184,7 @@ class HealthcareQueryController:
             query_executed = False
             
             try:
-                db_operation_service = DatabaseOperationService(db_manager)
+                db_operation_service = get_shared_db_ops_service(db_manager)
                 generated_query = query_result.get("query", "")
                 
                 if generated_query:
@@ -158,12 +158,10 @@ def update_access_token(new_access_token,organization):
 def refresh_cerner_access_token(organization) -> dict:
     tokens = load_cerner_tokens_db(organization)
     refresh_token = tokens['data'].get("refresh_token")
-    print("Refresh token",refresh_token)
     credentials = get_cerner_credentials(organization)
     if credentials["status"] == "error":
         return {"error": "Failed to fetch credentials", "details": credentials["message"]}
     creds = credentials['data']
-    print(creds)
     client_id = creds.get("client_id")
     token_url = creds.get("token_url")
     client_secret = creds.get("client_secret")
@@ -182,7 +180,6 @@ def refresh_cerner_access_token(organization) -> dict:
     }
 
     response = requests.post(TOKEN_URL, data=data, headers=headers)
-    print(response.status_code)
     if response.status_code == 200:
         new_tokens = response.json()
         update_cerner_access_token_db(new_tokens,organization)
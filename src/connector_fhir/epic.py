@@ -33,9 +33,7 @@ def load_tokens_from_db(organization: str) -> dict:
     client = get_mongo_client()
     try:
         db = client["epic"]
-        print(organization, "organization")
         record = db.credentials.find_one({"organization_name": organization})
-        print(record, "recorddd")
         return record.get("tokens", {}) if record else {}
         # return record
     finally:
@@ -138,7 +136,6 @@ def extract_organization_from_state(state: str) -> str:
 
 def refresh_access_token(organization: str) -> dict:
     credentials = get_epic_credentials(organization)
-    print(credentials, "credentials")
     if credentials["status"] == "error":
         raise Exception(f"Failed to fetch credentials: {credentials['message']}")
 
@@ -158,7 +155,6 @@ def refresh_access_token(organization: str) -> dict:
     response = requests.post(EPIC_TOKEN_URL, data=payload)
     if response.status_code == 200:
         new_tokens = response.json()
-        print("new token",new_tokens)
         save_tokens_to_db(organization, new_tokens)
         return new_tokens
     else:
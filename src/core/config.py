@@ -64,6 +64,8 @@ class Settings:
     QUERY_TIMEOUT_SECONDS: int = int(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
     MAX_ROWS_PER_QUERY: int = int(os.getenv("MAX_ROWS_PER_QUERY", "10000"))
     REPORT_EXPIRY_MINUTES: int = int(os.getenv("REPORT_EXPIRY_MINUTES", "5"))
+    EPIC_BATCH_CONCURRENCY: int = int(os.getenv("EPIC_BATCH_CONCURRENCY", "20"))  # Matches the Epic client keep-alive pool
+    EPIC_BATCH_MAX_PATIENTS: int = int(os.getenv("EPIC_BATCH_MAX_PATIENTS", "100"))
     
     # Database connection timeout (working settings for MongoDB Atlas)
     DB_CONNECTION_TIMEOUT_MS: int = int(os.getenv("DB_CONNECTION_TIMEOUT_MS", "20000"))  # 20 seconds
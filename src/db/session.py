@@ -131,6 +131,6 @@ class DatabaseManager:
 db_manager = DatabaseManager()
 
 
-def get_database_manager() -> DatabaseManager:
+async def get_database_manager() -> DatabaseManager:
     """Dependency to get database manager."""
     return db_manager
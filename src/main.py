@@ -1,5 +1,6 @@
 """Main FastAPI application entry point."""
 
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -7,6 +8,9 @@ from core.config import settings
 from api import connections, healthcare, dashboard, routes, epic_tools, cerner_router, epic_router, cerner_tools
 from utils.helpers import setup_logging
 from db.session import db_manager
+from utils.epic import raise_on_unauthorized as raise_on_epic_unauthorized
+from utils.cerner import FHIR_BASE_URL as CERNER_FHIR_BASE_URL, CERNER_TIMEOUT, CERNER_CONNECT_RETRIES
+from utils.cerner import raise_on_unauthorized as raise_on_cerner_unauthorized
 from api.agents import router as agents_router
 
 
@@ -19,11 +23,33 @@ async def lifespan(app: FastAPI):
         print("PHA Server ready - Dashboard endpoints use real database connections only!")
     except Exception as e:
         print(f"Failed to initialize database connection: {e}")
+    
+    # Pooled client shared by all Epic FHIR requests; 401s raise so epic_handler can drop a rejected token
+    app.state.epic_client = httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60.0),
+        event_hooks={"response": [raise_on_epic_unauthorized]},
+    )
+    # Pooled client shared by all Cerner FHIR requests (condition reads override the timeout per call);
+    # the transport retries failed connection attempts, which are safe to repeat; 401s raise so the token is dropped
+    app.state.cerner_client = httpx.AsyncClient(
+        base_url=CERNER_FHIR_BASE_URL,
+        timeout=CERNER_TIMEOUT,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=CERNER_CONNECT_RETRIES,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0),
+        ),
+        event_hooks={"response": [raise_on_cerner_unauthorized]},
+    )
         
     yield
     
    
     try:
+        await app.state.epic_client.aclose()
+        await app.state.cerner_client.aclose()
         if db_manager.client:
             db_manager.close()
     except Exception as e:
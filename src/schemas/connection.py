@@ -64,6 +64,7 @@ class DatabaseTable(BaseModel):
     type: str = Field(..., description="Type (table, collection, view)")
     fields: List[DatabaseField] = Field(..., description="List of fields/columns")
     row_count: Optional[int] = Field(None, description="Approximate number of rows/documents")
+    primary_keys: Optional[List[str]] = Field(None, description="Primary key columns, when reported by the database")
 
 
 class DatabaseSchemaResult(BaseModel):
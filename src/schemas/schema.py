@@ -7,7 +7,8 @@ class Credentials(BaseModel):
     organization_name:str
     password:str
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from core.config import settings
 
 class PatientSummary(BaseModel):
     summary: str
@@ -15,6 +16,9 @@ class PatientSummary(BaseModel):
 class PatientRequest(BaseModel):
     patient_id: str
     organization_name: str
+
+class BatchPatientRequest(BaseModel):
+    patient_ids: list[str] = Field(..., min_length=1, max_length=settings.EPIC_BATCH_MAX_PATIENTS)
   
 class Summary(BaseModel):
     patient_info:str
@@ -98,6 +98,7 @@ async def _generic_agent_flow(
             connection_id=connection_id,
             query_request=formatted_prompt,
             patient_id=patient_id,
+            schema_result=schema_result,
             schema_context=schema_context
         )
 
@@ -3,18 +3,56 @@
 import os
 import json
 import re
+import time
 import boto3
+from collections import OrderedDict
 from botocore.exceptions import ClientError, NoCredentialsError
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
 
 from core.config import settings
 from prompt.prompts import BEDROCK_QUERY_GENERATION_PROMPT
 
 
+# (epoch second, formatted timestamp) of the last timestamp produced
+_timestamp_cache: Tuple[int, str] = (0, "")
+
+
+def _utcnow_iso() -> str:
+    """Return the current UTC time as an ISO string, reformatted at most once per second."""
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, cached_value = _timestamp_cache
+    if cached_second == second:
+        return cached_value
+    value = datetime.fromtimestamp(second, timezone.utc).replace(tzinfo=None).isoformat()
+    _timestamp_cache = (second, value)
+    return value
+
+
 class BedrockService:
     """AWS Bedrock service for AI-powered healthcare query generation."""
-    
+
+    # Query type keywords, checked in priority order
+    _QUERY_TYPE_KEYWORDS = (
+        ('comprehensive', ('comprehensive', 'complete', 'full', 'all')),
+        ('clinical', ('clinical', 'medical', 'diagnosis', 'medication', 'procedure', 'lab')),
+        ('billing', ('billing', 'financial', 'payment', 'insurance', 'claim')),
+        ('basic', ('basic', 'simple', 'demographic')),
+    )
+
+    # One compiled alternation per keyword group (substring semantics, like `in`)
+    _QUERY_TYPE_PATTERNS = tuple(
+        (query_type, re.compile('|'.join(map(re.escape, keywords))))
+        for query_type, keywords in _QUERY_TYPE_KEYWORDS
+    )
+
+    # Rendered schema descriptions keyed by (database_type, schema fingerprint).
+    # The fingerprint tuple itself is the key, so distinct schemas can never collide.
+    # Shared across instances (there is one service per DatabaseManager, plus any built directly).
+    _SCHEMA_DESCRIPTION_CACHE_SIZE = 32
+    _schema_description_cache: "OrderedDict[Tuple[str, tuple], str]" = OrderedDict()
+
     def __init__(self, db_manager):
         """Initialize BedrockService with database manager."""
         self.db_manager = db_manager
@@ -34,14 +72,63 @@ class BedrockService:
             print(f"Warning: Failed to initialize Bedrock client: {e}")
             self.bedrock_client = None
     
+    @staticmethod
+    def _schema_fingerprint(tables_info: list) -> tuple:
+        """Collect the parts of the schema that appear in the rendered description as a hashable tuple."""
+        return tuple(
+            (
+                table.get("name", "unknown"),
+                str(table.get("row_count", "unknown")),
+                tuple(
+                    (
+                        column.get("name", "unknown"),
+                        str(column.get("type", "unknown")),
+                        bool(column.get("nullable", True)),
+                        bool(column.get("primary_key", False)),
+                    )
+                    for column in table.get("columns", [])
+                ),
+                tuple(
+                    tuple(keys)
+                    for keys in (
+                        (table.get("constraints") or {}).get("primary_keys", []),
+                        (table.get("constraints") or {}).get("foreign_keys", []),
+                    )
+                ),
+            )
+            for table in tables_info
+        )
+
     def _build_schema_description(self, tables_info: list, database_type: str) -> str:
-        """Build a detailed schema description including columns for the prompt."""
+        """Build a detailed schema description, reusing the cached text for a known schema."""
         if not tables_info:
             return "No table information available."
 
+        cache = self._schema_description_cache
+        key = (database_type, self._schema_fingerprint(tables_info))
+
+        try:
+            description = cache.get(key)
+        except TypeError:
+            # Unhashable values in the schema; render without caching
+            return self._render_schema_description(tables_info, database_type)
+        if description is not None:
+            cache.move_to_end(key)
+            return description
+
+        description = self._render_schema_description(tables_info, database_type)
+        cache[key] = description
+        if len(cache) > self._SCHEMA_DESCRIPTION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return description
+
+    def _render_schema_description(self, tables_info: list, database_type: str) -> str:
+        """Render the schema description including columns for the prompt."""
+
         schema_lines = []
-        schema_lines.append("DATABASE SCHEMA DETAILS:")
-        schema_lines.append("=" * 80)
+        add = schema_lines.append
+        add("DATABASE SCHEMA DETAILS:")
+        add("=" * 80)
 
         for table in tables_info:
             table_name = table.get("name", "unknown")
@@ -50,18 +137,18 @@ class BedrockService:
             # Get columns from the unified schema structure
             columns = table.get("columns", [])  # This is the correct key from unified schema
         
-            schema_lines.append(f"\nTable: {table_name}")
-            schema_lines.append(f"Rows: {row_count}")
-            schema_lines.append("-" * 60)
+            add(f"\nTable: {table_name}")
+            add(f"Rows: {row_count}")
+            add("-" * 60)
         
             if not columns:
-                schema_lines.append("  No column information available")
+                add("  No column information available")
                 continue
         
             # Add column headers
-            schema_lines.append("  Columns:")
-            schema_lines.append(f"  {'Column Name':<25} {'Data Type':<20} {'Nullable':<10} {'Key':<15}")
-            schema_lines.append(f"  {'-'*25} {'-'*20} {'-'*10} {'-'*15}")
+            add("  Columns:")
+            add(f"  {'Column Name':<25} {'Data Type':<20} {'Nullable':<10} {'Key':<15}")
+            add(f"  {'-'*25} {'-'*20} {'-'*10} {'-'*15}")
         
             # Add each column with detailed information
             for column in columns:  # These are dictionaries from unified schema
@@ -74,14 +161,10 @@ class BedrockService:
                 nullable_str = "YES" if is_nullable else "NO"
             
                 # Format key information
-                key_info = ""
-                if is_primary:
-                    key_info = "PRIMARY KEY"
-                else:
-                    key_info = ""
+                key_info = "PRIMARY KEY" if is_primary else ""
             
                 # Format the column row
-                schema_lines.append(f"  {column_name:<25} {column_type:<20} {nullable_str:<10} {key_info:<15}")
+                add(f"  {column_name:<25} {column_type:<20} {nullable_str:<10} {key_info:<15}")
         
             # Add constraints if available
             constraints = table.get("constraints", {})
@@ -90,36 +173,30 @@ class BedrockService:
                 foreign_keys = constraints.get("foreign_keys", [])
                 
                 if primary_keys:
-                    schema_lines.append(f"\n  Primary Keys: {', '.join(primary_keys)}")
+                    add(f"\n  Primary Keys: {', '.join(primary_keys)}")
                 if foreign_keys:
-                    schema_lines.append(f"  Foreign Keys: {', '.join(foreign_keys)}")
+                    add(f"  Foreign Keys: {', '.join(foreign_keys)}")
         
-            schema_lines.append("")  # Empty line between tables
+            add("")  # Empty line between tables
 
         # Add database-specific notes
-        schema_lines.append("\nIMPORTANT NOTES:")
-        schema_lines.append(f"- Database Type: {database_type}")
-        schema_lines.append("- Use exact table and column names as shown above")
-        schema_lines.append("- Pay attention to data types for proper query construction")
-        schema_lines.append("- Consider nullable columns when writing WHERE clauses")
-        schema_lines.append("- Use primary keys for JOIN operations when possible")
+        add("\nIMPORTANT NOTES:")
+        add(f"- Database Type: {database_type}")
+        add("- Use exact table and column names as shown above")
+        add("- Pay attention to data types for proper query construction")
+        add("- Consider nullable columns when writing WHERE clauses")
+        add("- Use primary keys for JOIN operations when possible")
 
         return "\n".join(schema_lines)
     
     def _parse_query_type(self, query_request: str) -> str:
         """Parse the natural language query request to determine query type."""
         request_lower = query_request.lower()
-        
-        # Define query type keywords
-        if any(word in request_lower for word in ['comprehensive', 'complete', 'full', 'all']):
-            return 'comprehensive'
-        elif any(word in request_lower for word in ['clinical', 'medical', 'diagnosis', 'medication', 'procedure', 'lab']):
-            return 'clinical'
-        elif any(word in request_lower for word in ['billing', 'financial', 'payment', 'insurance', 'claim']):
-            return 'billing'
-        elif any(word in request_lower for word in ['basic', 'simple', 'demographic']):
-            return 'basic'
-        
+
+        for query_type, pattern in self._QUERY_TYPE_PATTERNS:
+            if pattern.search(request_lower):
+                return query_type
+
         # Default to comprehensive
         return 'comprehensive'
     
@@ -128,6 +205,7 @@ class BedrockService:
         connection_id: str, 
         query_request: str, 
         patient_id: Optional[str] = None,
+        schema_result=None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -137,6 +215,7 @@ class BedrockService:
             connection_id: Database connection ID
             query_request: Natural language query request
             patient_id: Optional patient ID for filtering
+            schema_result: Optional already-fetched schema result; fetched from the connection when omitted
             **kwargs: Additional parameters (limit, query_type, etc.)
             
         Returns:
@@ -146,29 +225,30 @@ class BedrockService:
             return {
                 "status": "error",
                 "error": "AWS Bedrock client not initialized. Please check your AWS credentials.",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
         
         try:
-            # Import here to avoid circular dependency
-            from services.connection_service import ConnectionService
-            
-            # Step 1: Get database schema
-            connection_service = ConnectionService(self.db_manager)
-            schema_result = await connection_service.get_database_schema(connection_id)
+            # Step 1: Get database schema, unless the caller already has it
+            if schema_result is None:
+                # Import here to avoid circular dependency
+                from services.connection_service import ConnectionService
+                
+                connection_service = ConnectionService(self.db_manager)
+                schema_result = await connection_service.get_database_schema(connection_id)
             
             if schema_result.status != "success":
                 return {
                     "status": "error",
                     "error": f"Failed to retrieve schema: {schema_result.message}",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _utcnow_iso()
                 }
             
             if not schema_result.unified_schema:
                 return {
                     "status": "error",
                     "error": "Unified schema not available for this database connection",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _utcnow_iso()
                 }
             
             # Step 2: Prepare prompt for Claude using prompts file
@@ -202,14 +282,14 @@ class BedrockService:
                     "schema_tables_count": len(schema_result.tables) if schema_result.tables else 0
                 },
                 "database_type": schema_result.database_type,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
             
         except Exception as e:
             return {
                 "status": "error",
                 "error": f"Failed to generate healthcare query: {str(e)}",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
     
     def _create_bedrock_prompt(
@@ -222,8 +302,7 @@ class BedrockService:
         """Create a comprehensive prompt for AWS Bedrock Claude AI using prompts file."""
         # Extract key information
         database_type = schema_result.database_type
-        unified_schema = schema_result.unified_schema
-        tables_info = unified_schema.get("tables", [])
+        tables_info = (schema_result.unified_schema or {}).get("tables") or []
         
         # Build schema description using local method
         schema_description = self._build_schema_description(tables_info, database_type)
@@ -271,14 +350,14 @@ class BedrockService:
             return {
                 "status": "success",
                 "raw_response": response_data,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
             
         except NoCredentialsError:
             return {
                 "status": "error",
                 "error": "AWS credentials not found. Please configure AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY.",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
         except ClientError as e:
             error_code = e.response['Error']['Code']
@@ -286,13 +365,13 @@ class BedrockService:
             return {
                 "status": "error",
                 "error": f"AWS Bedrock API error ({error_code}): {error_message}",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
         except Exception as e:
             return {
                 "status": "error",
                 "error": f"Bedrock API call failed: {str(e)}",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
     
     def _extract_query_from_response(self, raw_response: Dict) -> str:
@@ -371,7 +450,7 @@ class BedrockService:
             return {
                 "status": "error",
                 "error": "Bedrock client not initialized. Please check AWS credentials.",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
         
         try:
@@ -401,12 +480,12 @@ class BedrockService:
                 "model_id": settings.BEDROCK_MODEL_ID,
                 "region": settings.AWS_DEFAULT_REGION,
                 "test_response": response_data.get('content', [{}])[0].get('text', ''),
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
             
         except Exception as e:
             return {
                 "status": "error",
                 "error": f"Bedrock connection test failed: {str(e)}",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utcnow_iso()
             }
\ No newline at end of file
@@ -129,27 +129,13 @@ class ConnectionService:
         collection = self.db_manager.get_connections_collection()
         
         try:
-            # Build update document
-            update_doc = {}
-            if update_data.connection_name is not None:
-                update_doc["connection_name"] = update_data.connection_name
-            if update_data.database_type is not None:
-                update_doc["database_type"] = update_data.database_type
-            if update_data.host is not None:
-                update_doc["host"] = update_data.host
-            if update_data.port is not None:
-                update_doc["port"] = update_data.port
-            if update_data.database_name is not None:
-                update_doc["database_name"] = update_data.database_name
-            if update_data.username is not None:
-                update_doc["username"] = update_data.username
-            if update_data.password is not None:
-                update_doc["password"] = update_data.password
-            if update_data.additional_notes is not None:
-                update_doc["additional_notes"] = update_data.additional_notes
+            # Build update document from the fields the caller actually set
+            update_doc = update_data.model_dump(exclude_none=True)
             
             update_doc["updated_at"] = datetime.utcnow()
             
+            # Cached schema and driver clients are keyed on the settings being replaced
+            previous = await self.get_connection_by_id(connection_id)
             result = collection.update_one(
                 {"_id": ObjectId(connection_id)},
                 {"$set": update_doc}
@@ -159,7 +145,11 @@ class ConnectionService:
                 return None
             
             # Return updated connection
-            return await self.get_connection_by_id(connection_id)
+            connection = await self.get_connection_by_id(connection_id)
+            for stale in (previous, connection):
+                if stale is not None:
+                    self.schema_extractor.invalidate(stale)
+            return connection
             
         except Exception:
             return None
@@ -169,7 +159,10 @@ class ConnectionService:
         collection = self.db_manager.get_connections_collection()
         
         try:
+            connection = await self.get_connection_by_id(connection_id)
             result = collection.delete_one({"_id": ObjectId(connection_id)})
+            if result.deleted_count > 0 and connection is not None:
+                self.schema_extractor.invalidate(connection)
             return result.deleted_count > 0
         except Exception:
             return False
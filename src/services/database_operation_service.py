@@ -20,6 +20,18 @@ from services.connection_service import ConnectionService
 class DatabaseOperationService:
     """Service for executing queries against different database types."""
     
+    # Normalized database type -> executor method name
+    _QUERY_EXECUTORS = {
+        "mongodb": "_execute_mongodb_query",
+        "postgresql": "_execute_postgresql_query",
+        "postgres": "_execute_postgresql_query",
+        "mysql": "_execute_mysql_query",
+        "oracle": "_execute_oracle_query",
+        "sqlserver": "_execute_sqlserver_query",
+        "mssql": "_execute_sqlserver_query",
+        "snowflake": "_execute_snowflake_query",
+    }
+    
     def __init__(self, db_manager):
         self.db_manager = db_manager
         self.connection_service = ConnectionService(db_manager)
@@ -133,28 +145,20 @@ class DatabaseOperationService:
         if not connection:
             raise ValueError(f"Connection not found: {connection_id}")
         
+        # Normalize the database type once for validation and dispatch
+        database_type = connection.database_type.lower()
+        
         # Validate query safety
-        validation_result = self.validate_query_safety(query, connection.database_type)
+        validation_result = self.validate_query_safety(query, database_type)
         if not validation_result.is_valid:
             raise ValueError(f"Query validation failed: {validation_result.validation_errors}")
         
         # Execute based on database type
-        database_type = connection.database_type.lower()
-        
-        if database_type == "mongodb":
-            return await self._execute_mongodb_query(connection, query, limit, params)
-        elif database_type in ["postgresql", "postgres"]:
-            return await self._execute_postgresql_query(connection, query, limit, params)
-        elif database_type == "mysql":
-            return await self._execute_mysql_query(connection, query, limit, params)
-        elif database_type == "oracle":
-            return await self._execute_oracle_query(connection, query, limit, params)
-        elif database_type in ["sqlserver", "mssql"]:
-            return await self._execute_sqlserver_query(connection, query, limit, params)
-        elif database_type == "snowflake":
-            return await self._execute_snowflake_query(connection, query, limit, params)
-        else:
+        executor_name = self._QUERY_EXECUTORS.get(database_type)
+        if executor_name is None:
             raise ValueError(f"Unsupported database type: {database_type}")
+        
+        return await getattr(self, executor_name)(connection, query, limit, params)
     
     def _parse_snowflake_connection_string(self, connection_string: str) -> Dict[str, Any]:
         """Parse Snowflake connection string specifically."""
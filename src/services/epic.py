@@ -1,12 +1,15 @@
+import asyncio
+import functools
 import httpx
 from fastapi import HTTPException
-import json
 import logging
-from connector_fhir.epic import refresh_access_token
+from core.config import settings
+from utils.token_cache import get_access_token, invalidate as invalidate_access_token
+from utils.fhir_cache import cached_fetch
 from utils.epic import get_lab_results, get_patient_info, get_current_conditions, get_appointments,get_upcoming_appointments, get_observations, get_medications, get_procedure, get_allergy, get_nutrition
 from prompt.prompt import  medication_prompt, build_diagnosis_prompt, lab_prompt, procedure_prompt_epic, observation_patient_prompt, observation_vitals_prompt, unify_prompt, goal_prompt, before_appointment_prompt, after_appointment_prompt, allergy_prompt, immunization_prompt, merge_patient_prompt, unify_obs_prompt, cerner_upcoming_prompt, nutrition_prompt, diet_prompt, risk_prompt, aftercare_prompt
 from utils.formatter_fhir import extract_patient_name, clean_fhir_data, preprocess_observations, extract_epic_condition, extract_procedure, extract_allergy, extract_observations_epic, extract_observations, extract_epic_medications, extract_vitals_from_observations
-from utils.aws import call_bedrock_summary
+from utils.aws import call_bedrock_summary_async, collect_bedrock_summary
 from utils.chunking import chunk
 
 
@@ -14,374 +17,239 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def generate_patient_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            patient_info = await get_patient_info(client, headers, patient_id)
-            observations = await get_observations(client, headers, patient_id)
-            # obs_str = json.dumps(observations)
-            # result = clean_fhir_data(obs_str)
-            result = preprocess_observations(observations)
-            # print(result)
-            print(result, "🎉🎉🎉🎉🎉🎉🎉🎉🎉")
-            print("vitals",result["vital_signs"])
-        patient_name = extract_patient_name(patient_info)
-        patient_prompt = observation_patient_prompt(patient_name, patient_info)
-        summary=""
-        patient_summary_resp=call_bedrock_summary(patient_prompt)
-        patient_summary = ""
-        async for part in patient_summary_resp.body_iterator:
-            patient_summary += part
-
-        summary += patient_summary
-        vitals_summary = await chunk(result["vital_signs"], observation_vitals_prompt)
-        summary += vitals_summary
-        print(summary)
-        prompt=merge_patient_prompt(summary)
-        # prompt = observation_prompt(patient_name, patient_info, result)
-        return call_bedrock_summary(prompt)
+def epic_handler(log_message: str, error_detail: str):
+    """Give an Epic handler its FHIR headers and turn any failure into an HTTP 500.
+
+    The wrapped handler receives ``client`` and ``headers`` as keyword arguments;
+    callers keep using ``(patient_id, organization, client)``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(patient_id: str, organization: str, client: httpx.AsyncClient):
+            try:
+                access_token = await get_access_token(organization)
+                headers = {
+                    "Authorization": f"Bearer {access_token}",
+                    "Accept": "application/fhir+json"
+                }
+                return await func(patient_id, organization, client=client, headers=headers)
+            except Exception as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 401:
+                    # Revoked or rotated early; make the next request fetch a fresh token
+                    invalidate_access_token(organization)
+                logger.error(f"{log_message}: {str(e)}")
+                raise HTTPException(status_code=500, detail=error_detail)
+        return wrapper
+    return decorator
+
+
+@epic_handler("Summary generation failed", "Summary generation failed")
+async def generate_patient_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    patient_info, observations = await asyncio.gather(
+        get_patient_info(client, headers, patient_id),
+        get_observations(client, headers, patient_id),
+    )
+    # obs_str = json.dumps(observations)
+    # result = clean_fhir_data(obs_str)
+    result = preprocess_observations(observations)
+    # print(result)
+    patient_name = extract_patient_name(patient_info)
+    patient_prompt = observation_patient_prompt(patient_name, patient_info)
+    patient_summary, vitals_summary = await asyncio.gather(
+        collect_bedrock_summary(patient_prompt),
+        chunk(result["vital_signs"], observation_vitals_prompt),
+    )
+    summary = patient_summary + vitals_summary
+    prompt=merge_patient_prompt(summary)
+    # prompt = observation_prompt(patient_name, patient_info, result)
+    return await call_bedrock_summary_async(prompt)
     
-    except Exception as e:
-        logger.error(f"Summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Summary generation failed")
     
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_medication_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    medications = await get_medications(client, headers, patient_id)
+    # data = clean_fhir_data(medications_str)
+    summary=await chunk(extract_epic_medications(medications), medication_prompt)
+    prompt = unify_prompt(summary)
+    # prompt=medication_prompt(data)
+    return await call_bedrock_summary_async(prompt)
     
-async def generate_medication_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            medications = await get_medications(client, headers, patient_id)
-            medications_str = json.dumps(medications)
-            # data = clean_fhir_data(medications_str)
-            summary=await chunk(medications_str, medication_prompt)
-        print(summary)
-        prompt = unify_prompt(summary)
-        # prompt=medication_prompt(data)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_condition_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    conditions = await get_current_conditions(client, headers, patient_id)
+    # cleaned=preprocess_condition(conditions)
+    summary=await chunk(extract_epic_condition(conditions), build_diagnosis_prompt)
+    prompt = unify_prompt(summary)
+    return await call_bedrock_summary_async(prompt)
+
+
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_Followup_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    Followup = await get_appointments(client, headers, patient_id)
+    # cleaned=clean_fhir_data(Followup)
+    bef=Followup["before_appointments"]
+    aft=Followup["after_appointment"]
+    Goal=Followup["goal"]
+    # print(Goal)
+    # print(bef)
+    before_summary, after_summary, goal_summary = await asyncio.gather(
+        chunk(bef, before_appointment_prompt),
+        chunk(aft, after_appointment_prompt),
+        chunk(Goal, goal_prompt),
+    )
+    summary = before_summary + after_summary + goal_summary
+    prompt = unify_prompt(summary)
+    return await call_bedrock_summary_async(prompt)
+
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_lab_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    lab = await get_lab_results(client, headers, patient_id)
+    data=clean_fhir_data(lab)
+    diagnostic=data["diagnostic_reports"]
+    observation=data["observations"]
+    diagnostic_summary, observation_summary = await asyncio.gather(
+        chunk(diagnostic, lab_prompt),
+        chunk(observation, lab_prompt),
+    )
+    summary = diagnostic_summary + observation_summary
+    prompt = unify_obs_prompt(summary)
+    return await call_bedrock_summary_async(prompt)
+
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_procedure_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    lab = await get_procedure(client, headers, patient_id)
+    summary=await chunk(extract_procedure(lab), procedure_prompt_epic)
+    prompt = unify_prompt(summary)
+    return await call_bedrock_summary_async(prompt)
     
-async def generate_condition_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            conditions = await get_current_conditions(client, headers, patient_id)
-            folup_str = json.dumps(conditions)
-            cleaned=clean_fhir_data(folup_str)
-            # cleaned=preprocess_condition(conditions)
-            print("condition",conditions)
-            summary=await chunk(cleaned, build_diagnosis_prompt)
-        prompt = unify_prompt(summary)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-
-
-async def generate_Followup_summary(patient_id: str, organization:str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            Followup = await get_appointments(client, headers, patient_id)
-            # cleaned=clean_fhir_data(Followup)
-            bef=Followup["before_appointments"]
-            aft=[Followup["after_appointment"]]
-            Goal=[Followup["goal"]]
-            # print(Goal)
-            # print(bef)
-            summary=""
-            before_summary = await chunk(bef, before_appointment_prompt)
-            summary += before_summary
-            after_summary = await chunk(aft, after_appointment_prompt)
-            summary += after_summary    
-            goal_summary = await chunk(Goal, goal_prompt)
-            summary += goal_summary
-            print("goal",goal_summary)
-            print(summary)
-        prompt = unify_prompt(summary)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-
-async def generate_lab_summary(patient_id: str, organization:str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            lab = await get_lab_results(client, headers, patient_id)
-            lab_str = json.dumps(lab)
-            data=clean_fhir_data(lab_str)
-            diagnostic=data["diagnostic_reports"]
-            observation=data["observations"]
-            summary=""
-            diagnostic_summary = await chunk(diagnostic, lab_prompt)
-            summary += diagnostic_summary
-            observation_summary = await chunk(observation,  lab_prompt)
-            summary += observation_summary
-            print(summary) 
-        prompt = unify_obs_prompt(summary)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-
-async def generate_procedure_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            lab = await get_procedure(client, headers, patient_id)
-            lab_str = json.dumps(lab)
-            data=clean_fhir_data(lab_str)
-            summary=await chunk(data, procedure_prompt_epic)
-            print(summary)
-        prompt = unify_prompt(summary)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-    
-async def generate_allergy_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            allergy = await get_allergy(client, headers, patient_id)
-            lab_str = json.dumps(allergy)
-            data=clean_fhir_data(lab_str)
-            print(data)
-            allergy=data['allergy']
-            immunization=data['immunization']
-            summary=""
-            allergy_summary = await chunk(allergy, allergy_prompt)
-            summary += allergy_summary
-            immunization_summary = await chunk(immunization,  immunization_prompt)
-            summary += immunization_summary
-            print(summary) 
-        # prompt = allergy_prompt_epic(data)
-        prompt = unify_prompt(summary)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_allergy_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    allergy = await get_allergy(client, headers, patient_id)
+    data=clean_fhir_data(allergy)
+    allergy=data['allergy']
+    immunization=data['immunization']
+    allergy_summary, immunization_summary = await asyncio.gather(
+        chunk(allergy, allergy_prompt),
+        chunk(immunization, immunization_prompt),
+    )
+    summary = allergy_summary + immunization_summary
+    # prompt = allergy_prompt_epic(data)
+    prompt = unify_prompt(summary)
+    return await call_bedrock_summary_async(prompt)
     
 
-async def generate_upcoming_appointment_summary(patient_id: str, organization:str):
-    print("hello")
-    try:
-        print("org",organization)
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            Followup = await get_upcoming_appointments(client, headers, patient_id)
-            # cleaned=clean_fhir_data(Followup)
-            # bef=Followup["before_appointments"]
-            aft=[Followup["after_appointment"]]
-            # Goal=[Followup["goal"]]
-            # print(Goal)
-            # print(bef)
-            # summary=""
-            # before_summary = await chunk(bef, before_appointment_prompt)
-            # summary += before_summary
-            # after_summary = await chunk(aft, after_appointment_prompt)
-            # summary += after_summary    
-            # goal_summary = await chunk(Goal, goal_prompt)
-            # summary += goal_summary
-            # print("goal",goal_summary)
-            # print(summary)
-        prompt = cerner_upcoming_prompt(aft)
-        print(prompt)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-
-async def generate_nutrition_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            nutrition = await get_nutrition(client, headers, patient_id)
-        prompt = nutrition_prompt(nutrition)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_upcoming_appointment_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    Followup = await get_upcoming_appointments(client, headers, patient_id)
+    # cleaned=clean_fhir_data(Followup)
+    # bef=Followup["before_appointments"]
+    aft=Followup["after_appointment"]
+    # Goal=[Followup["goal"]]
+    # print(Goal)
+    # print(bef)
+    # summary=""
+    # before_summary = await chunk(bef, before_appointment_prompt)
+    # summary += before_summary
+    # after_summary = await chunk(aft, after_appointment_prompt)
+    # summary += after_summary    
+    # goal_summary = await chunk(Goal, goal_prompt)
+    # summary += goal_summary
+    # print("goal",goal_summary)
+    # print(summary)
+    prompt = cerner_upcoming_prompt(aft)
+    return await call_bedrock_summary_async(prompt)
+
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_nutrition_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    nutrition = await get_nutrition(client, headers, patient_id)
+    prompt = nutrition_prompt(nutrition)
+    return await call_bedrock_summary_async(prompt)
     
-async def get_diet(patient_id: str,organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=50.0) as client:
-            patient = await get_patient_info(client, headers, patient_id)
-            patient_name = extract_patient_name(patient)
-            vitals = await get_observations(client, headers, patient_id)
-            processed_vitals=extract_observations(vitals)
-            # medication= await get_cerner_medication(client, headers, patient_id)
-            # print(medication)
-            # preprocessed_medication=preprocess_medications(medication)
-            condition=await get_current_conditions(client, headers, patient_id)
-            preprocessed_condition=extract_epic_condition(condition)
-            # print("condition",preprocessed_condition)
-            observation=await get_lab_results(client, headers, patient_id)
-            obs=observation['observations']
-            preprocessed_obs=extract_observations_epic(obs)
-            procedure=await get_procedure(client, headers, patient_id)
-            preprocessed_procedure=extract_procedure(procedure)
-            allergy_immun=await get_allergy(client, headers, patient_id)
-            allergy=allergy_immun['allergy']
-            print("allergyy",allergy)
-            # immunization=allergy_immun['immunization']
-            preprocessed_allergy=extract_allergy(allergy)
-            print("allergy",preprocessed_allergy)
-            # preprocessed_immunization=process_immunization(immunization)
-            prompt = diet_prompt(patient_name, preprocessed_condition, preprocessed_procedure, preprocessed_allergy,preprocessed_obs,processed_vitals)
-            return call_bedrock_summary(prompt)
-            
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
-
-async def risk(patient_id: str,organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=50.0) as client:
-            patient = await get_patient_info(client, headers, patient_id)
-            patient_name = extract_patient_name(patient)
-            vitals = await get_observations(client, headers, patient_id)
-            processed_vitals=extract_observations(vitals)
-            medication= await get_medications(client, headers, patient_id)
-            # print(medication)
-            preprocessed_medication=extract_epic_medications(medication)
-            condition=await get_current_conditions(client, headers, patient_id)
-            preprocessed_condition=extract_epic_condition(condition)
-            # print("condition",preprocessed_condition)
-            observation=await get_lab_results(client, headers, patient_id)
-            obs=observation['observations']
-            preprocessed_obs=extract_observations_epic(obs)
-            # procedure=await get_procedure(client, headers, patient_id)
-            # preprocessed_procedure=extract_procedure(procedure)
-            # allergy_immun=await get_allergy(client, headers, patient_id)
-            # allergy=allergy_immun['allergy']
-            # print("allergyy",allergy)
-            # # immunization=allergy_immun['immunization']
-            # preprocessed_allergy=extract_allergy(allergy)
-            # print("allergy",preprocessed_allergy)
-            # preprocessed_immunization=process_immunization(immunization)
-            prompt = risk_prompt(patient_name, preprocessed_condition, preprocessed_medication, preprocessed_obs,processed_vitals)
-            return call_bedrock_summary(prompt)
-            
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def get_diet(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    patient, vitals, condition, observation, procedure, allergy_immun = await asyncio.gather(
+        cached_fetch("patient", organization, patient_id, lambda: get_patient_info(client, headers, patient_id)),
+        cached_fetch("vital-signs", organization, patient_id, lambda: get_observations(client, headers, patient_id)),
+        cached_fetch("conditions", organization, patient_id, lambda: get_current_conditions(client, headers, patient_id)),
+        cached_fetch("lab-results", organization, patient_id, lambda: get_lab_results(client, headers, patient_id)),
+        cached_fetch("procedures", organization, patient_id, lambda: get_procedure(client, headers, patient_id)),
+        cached_fetch("allergies", organization, patient_id, lambda: get_allergy(client, headers, patient_id)),
+    )
+    patient_name = extract_patient_name(patient)
+    processed_vitals=extract_observations(vitals)
+    # medication= await get_cerner_medication(client, headers, patient_id)
+    # print(medication)
+    # preprocessed_medication=preprocess_medications(medication)
+    preprocessed_condition=extract_epic_condition(condition)
+    # print("condition",preprocessed_condition)
+    obs=observation['observations']
+    preprocessed_obs=extract_observations_epic(obs)
+    preprocessed_procedure=extract_procedure(procedure)
+    allergy=allergy_immun['allergy']
+    # immunization=allergy_immun['immunization']
+    preprocessed_allergy=extract_allergy(allergy)
+    # preprocessed_immunization=process_immunization(immunization)
+    prompt = diet_prompt(patient_name, preprocessed_condition, preprocessed_procedure, preprocessed_allergy,preprocessed_obs,processed_vitals)
+    return await call_bedrock_summary_async(prompt)
+
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def risk(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    patient, vitals, medication, condition, observation = await asyncio.gather(
+        cached_fetch("patient", organization, patient_id, lambda: get_patient_info(client, headers, patient_id)),
+        cached_fetch("vital-signs", organization, patient_id, lambda: get_observations(client, headers, patient_id)),
+        cached_fetch("medications", organization, patient_id, lambda: get_medications(client, headers, patient_id)),
+        cached_fetch("conditions", organization, patient_id, lambda: get_current_conditions(client, headers, patient_id)),
+        cached_fetch("lab-results", organization, patient_id, lambda: get_lab_results(client, headers, patient_id)),
+    )
+    patient_name = extract_patient_name(patient)
+    processed_vitals=extract_observations(vitals)
+    # print(medication)
+    preprocessed_medication=extract_epic_medications(medication)
+    preprocessed_condition=extract_epic_condition(condition)
+    # print("condition",preprocessed_condition)
+    obs=observation['observations']
+    preprocessed_obs=extract_observations_epic(obs)
+    # procedure=await get_procedure(client, headers, patient_id)
+    # preprocessed_procedure=extract_procedure(procedure)
+    # allergy_immun=await get_allergy(client, headers, patient_id)
+    # allergy=allergy_immun['allergy']
+    # print("allergyy",allergy)
+    # # immunization=allergy_immun['immunization']
+    # preprocessed_allergy=extract_allergy(allergy)
+    # print("allergy",preprocessed_allergy)
+    # preprocessed_immunization=process_immunization(immunization)
+    prompt = risk_prompt(patient_name, preprocessed_condition, preprocessed_medication, preprocessed_obs,processed_vitals)
+    return await call_bedrock_summary_async(prompt)
     
-async def generate_aftercare_summary(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        print("Access Token:", access_token)
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            medication= await get_medications(client, headers, patient_id)
-            # print(medication)
-            preprocessed_medication=extract_epic_medications(medication)
-            procedure=await get_procedure(client, headers, patient_id)
-            preprocessed_procedure=extract_procedure(procedure)
-            # condition=await get_cerner_condition(client, headers, patient_id)
-            # preprocessed_condition=extract_condition(condition)
-        prompt = aftercare_prompt(preprocessed_medication, preprocessed_procedure)
-        return call_bedrock_summary(prompt)
-
-    except Exception as e:
-        logger.error(f"Medication summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate medication summary")
+@epic_handler("Medication summary generation failed", "Failed to generate medication summary")
+async def generate_aftercare_summary(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    medication, procedure = await asyncio.gather(
+        cached_fetch("medications", organization, patient_id, lambda: get_medications(client, headers, patient_id)),
+        cached_fetch("procedures", organization, patient_id, lambda: get_procedure(client, headers, patient_id)),
+    )
+    # print(medication)
+    preprocessed_medication=extract_epic_medications(medication)
+    preprocessed_procedure=extract_procedure(procedure)
+    # condition=await get_cerner_condition(client, headers, patient_id)
+    # preprocessed_condition=extract_condition(condition)
+    prompt = aftercare_prompt(preprocessed_medication, preprocessed_procedure)
+    return await call_bedrock_summary_async(prompt)
     
-async def fetch_epic_observations(patient_id: str, organization: str):
-    try:
-        access_token = refresh_access_token(organization)["access_token"]
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json"
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            observations_vital = await get_observations(client, headers, patient_id, category="vital-signs")
-            # Fetch laboratory observations (for blood sugar, etc.)
-            observations_lab = await get_observations(client, headers, patient_id, category="laboratory")
-            # Combine both
-            observations = observations_vital + observations_lab
-            return observations
-    except Exception as e:
-        logger.error(f"Failed to fetch Epic observations: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch observations")
+@epic_handler("Failed to fetch Epic observations", "Failed to fetch observations")
+async def fetch_epic_observations(patient_id: str, organization: str, *, client: httpx.AsyncClient, headers: dict):
+    # Fetch vital-sign and laboratory observations (for blood sugar, etc.) together
+    observations_vital, observations_lab = await asyncio.gather(
+        get_observations(client, headers, patient_id, category="vital-signs"),
+        get_observations(client, headers, patient_id, category="laboratory"),
+    )
+    # Combine both
+    observations = observations_vital + observations_lab
+    return observations
     
-async def generate_vitals_summary(patient_id: str, organization: str):
+async def generate_vitals_summary(patient_id: str, organization: str, client: httpx.AsyncClient):
     try:
         # Fetch raw observations
-        observations = await fetch_epic_observations(patient_id, organization)
+        observations = await fetch_epic_observations(patient_id, organization, client)
 
         #print("Complete patient observation data:")
         #print(json.dumps(observations, indent=2))
@@ -413,4 +281,29 @@ async def generate_vitals_summary(patient_id: str, organization: str):
         return vitals
     except Exception as e:
         logger.error(f"Failed to generate vitals summary: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch or process vitals")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch or process vitals")
+
+
+# Shared by every batch request, so concurrent batches cannot multiply the load on Epic
+_batch_semaphore = asyncio.Semaphore(settings.EPIC_BATCH_CONCURRENCY)
+
+
+async def summarize_patients(handler, patient_ids: list, organization: str, client: httpx.AsyncClient) -> list:
+    """Run an Epic summary handler for several patients concurrently and collect the text.
+
+    At most ``settings.EPIC_BATCH_CONCURRENCY`` patients are processed at once
+    across all batch requests; a failure for one patient is reported in its
+    result instead of failing the batch.
+    """
+    async def _one(patient_id: str) -> str:
+        async with _batch_semaphore:
+            response = await handler(patient_id, organization, client)
+            return "".join([part async for part in response.body_iterator])
+
+    results = await asyncio.gather(*(_one(patient_id) for patient_id in patient_ids), return_exceptions=True)
+    return [
+        {"patient_id": patient_id, "error": getattr(result, "detail", str(result))}
+        if isinstance(result, Exception)
+        else {"patient_id": patient_id, "summary": result}
+        for patient_id, result in zip(patient_ids, results)
+    ]
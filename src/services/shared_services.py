@@ -0,0 +1,20 @@
+"""Process-wide service instances shared across requests."""
+
+from functools import lru_cache
+
+from services.bedrock_service import BedrockService
+from services.database_operation_service import DatabaseOperationService
+
+
+# Services are stateless, so one instance per DatabaseManager is shared across requests
+# (BedrockService builds a boto3 client, which is too costly to repeat per request)
+@lru_cache(maxsize=None)
+def get_shared_bedrock_service(db_manager) -> BedrockService:
+    """Return the BedrockService shared by every caller using db_manager."""
+    return BedrockService(db_manager)
+
+
+@lru_cache(maxsize=None)
+def get_shared_db_ops_service(db_manager) -> DatabaseOperationService:
+    """Return the DatabaseOperationService shared by every caller using db_manager."""
+    return DatabaseOperationService(db_manager)
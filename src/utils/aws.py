@@ -1,4 +1,7 @@
+import asyncio
 import json
+import orjson
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError
 import boto3
 import os
@@ -8,32 +11,53 @@ AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.environ.get("AWS_DEFAULT_REGION", "ap-south-1")
  
+# Concurrent summaries (chunk() fans out) would otherwise overflow botocore's default pool of 10
+BEDROCK_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    tcp_keepalive=True,
+)
+
 bedrock = boto3.client(
     "bedrock-runtime",
     region_name=AWS_REGION,
     aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
+    aws_secret_access_key=AWS_SECRET_KEY,
+    config=BEDROCK_CLIENT_CONFIG
 ) if AWS_ACCESS_KEY and AWS_SECRET_KEY else boto3.client(
     "bedrock-runtime",
-    region_name=AWS_REGION
+    region_name=AWS_REGION,
+    config=BEDROCK_CLIENT_CONFIG
 )
+
+
+# Every summary request has the same shape; only the prompt text is encoded per call
+_BODY_PREFIX = orjson.dumps({
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens": 6000,
+    "temperature": 0.3,
+})[:-1] + b',"messages":[{"role":"user","content":'
+_BODY_SUFFIX = b"}]}"
+
+
+def get_bedrock_client():
+    """Return the process-wide Bedrock runtime client."""
+    return bedrock
+
  
 def call_bedrock_summary(prompt: str):
     try:
-        response = bedrock.invoke_model_with_response_stream(
+        response = get_bedrock_client().invoke_model_with_response_stream(
             modelId="arn:aws:bedrock:ap-south-1:422228628797:inference-profile/apac.anthropic.claude-3-5-sonnet-20240620-v1:0",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 6000,
-                "temperature": 0.3,
-                "messages": [{"role": "user", "content": prompt}]
-            }),
+            body=_BODY_PREFIX + orjson.dumps(prompt) + _BODY_SUFFIX,
             contentType="application/json",
             accept="application/json"
         )
  
-        def stream_generator():
-            for event in response["body"]:
+        async def stream_generator():
+            # Each read on the event stream blocks, so pull events on a worker thread
+            events = iter(response["body"])
+            while (event := await asyncio.to_thread(next, events, None)) is not None:
                 if "chunk" in event and "bytes" in event["chunk"]:
                     chunk_data = json.loads(event["chunk"]["bytes"])
                     content = chunk_data.get("delta", {}).get("text", "")
@@ -44,3 +68,14 @@ def call_bedrock_summary(prompt: str):
     except BotoCoreError as e:
         raise Exception(f"Bedrock API call failed: {str(e)}")
  
+
+
+async def call_bedrock_summary_async(prompt: str):
+    """Start a Bedrock summary stream on a worker thread so the event loop is not blocked."""
+    return await asyncio.to_thread(call_bedrock_summary, prompt)
+
+
+async def collect_bedrock_summary(prompt: str) -> str:
+    """Run a Bedrock summary and return the full streamed text."""
+    response = await call_bedrock_summary_async(prompt)
+    return "".join([part async for part in response.body_iterator])
@@ -1,80 +1,109 @@
+import asyncio
+import httpx
+import orjson
+import time
+from functools import lru_cache
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timezone
 
+# Base URL of the shared Cerner client; helpers request paths relative to it
 FHIR_BASE_URL = "https://fhir-open.cerner.com/r4/ec2458f2-1e24-41c8-b71b-0e701af7583d"
 
+# Bounded so one slow resource cannot stall a gathered summary indefinitely
+CERNER_TIMEOUT = httpx.Timeout(30.0, connect=5.0, pool=5.0)
+# Condition searches are known to be slow on Cerner, so they get a longer read timeout
+CERNER_CONDITION_TIMEOUT = httpx.Timeout(100.0, connect=5.0, pool=5.0)
+# Connection attempts retried by the client transport before giving up
+CERNER_CONNECT_RETRIES = 2
+
+async def raise_on_unauthorized(response: httpx.Response) -> None:
+    """Response hook for the Cerner client: turn a 401 into HTTPStatusError so the cached token can be dropped."""
+    if response.status_code == 401:
+        response.raise_for_status()
+
 async def get_cerner_patient_info(client, headers, patient_id):
-    resp = await client.get(f"{FHIR_BASE_URL}/Patient/{patient_id}", headers=headers)
+    resp = await client.get(f"/Patient/{patient_id}", headers=headers)
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch patient info")
-    return resp.json()
+    return orjson.loads(resp.content)
 
 
 async def get_cerner_observations(client, headers, patient_id, category="vital-signs"):
-    url = f"{FHIR_BASE_URL}/Observation?patient={patient_id}"
+    params = {"patient": patient_id}
     if category:
-        url += f"&category={category}"
-    resp = await client.get(url, headers=headers)
+        params["category"] = category
+    resp = await client.get("/Observation", params=params, headers=headers)
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 async def get_cerner_observations_lab(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/Observation?patient={patient_id}&category=laboratory&_count=100",
+        "/Observation",
+        params={"patient": patient_id, "category": "laboratory", "_count": 100},
         headers=headers
     )
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 async def get_cerner_diagnostic_lab(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/DiagnosticReport?patient={patient_id}",
+        "/DiagnosticReport",
+        params={"patient": patient_id},
         headers=headers
     )
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 async def get_cerner_medication(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/MedicationRequest?patient={patient_id}",
+        "/MedicationRequest",
+        params={"patient": patient_id},
         headers=headers
     )
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 async def get_cerner_condition(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/Condition?patient={patient_id}",
+        "/Condition",
+        params={"patient": patient_id},
         headers=headers,
-        timeout=100
+        timeout=CERNER_CONDITION_TIMEOUT
     )
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 
 async def get_diagnostics(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/DiagnosticReport?patient={patient_id}&_count=50",
+        "/DiagnosticReport",
+        params={"patient": patient_id, "_count": 50},
         headers=headers
     )
     if resp.status_code != 200:
         return []
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
+
+@lru_cache(maxsize=1)
+def _minute_iso(minute: int) -> str:
+    return datetime.fromtimestamp(minute * 60, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _now_iso() -> str:
+    """Current UTC time as a FHIR instant, truncated to the minute and reused within it."""
+    return _minute_iso(int(time.time() // 60))
+
 
 async def get_appointments(client, headers, patient_id: str) -> dict:
-    current_date = datetime.now(timezone.utc).isoformat()
-    after_url = (
-        f"{FHIR_BASE_URL}/Appointment?patient={patient_id}&date=ge2025-05-01T13:45:00Z"
-        f"&_sort=date"
-    )
+    after_params = {"patient": patient_id, "date": f"ge{_now_iso()}", "_sort": "date"}
 
-    after_resp = await client.get(after_url, headers=headers)
-    after_data = after_resp.json().get("entry", [])
+    after_resp = await client.get("/Appointment", params=after_params, headers=headers)
+    after_data = orjson.loads(after_resp.content).get("entry", [])
 
     after_appointment = after_data[0].get("resource", {}) if after_data else {}
 
@@ -83,42 +112,38 @@ async def get_appointments(client, headers, patient_id: str) -> dict:
     }
 
 async def get_procedure(client, headers, patient_id: str):
-    url = f"{FHIR_BASE_URL}/Procedure?patient={patient_id}"
-
-    response = await client.get(url, headers=headers)
+    response = await client.get("/Procedure", params={"patient": patient_id}, headers=headers)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    procedure = response.json().get("entry", [])
+    procedure = orjson.loads(response.content).get("entry", [])
     
     return [entry.get("resource", {}) for entry in procedure]
 
 
 async def get_allergy(client, headers, patient_id: str):
-    allergy_url = f"{FHIR_BASE_URL}/AllergyIntolerance?patient={patient_id}"
-    response = await client.get(allergy_url, headers=headers)
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
-
-    allergy = response.json().get("entry", [])
-    immun_url = f"{FHIR_BASE_URL}/Immunization?patient={patient_id}"
-
-    response = await client.get(immun_url, headers=headers)
+    params = {"patient": patient_id}
+    allergy_resp, immun_resp = await asyncio.gather(
+        client.get("/AllergyIntolerance", params=params, headers=headers),
+        client.get("/Immunization", params=params, headers=headers),
+    )
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
+    for response in (allergy_resp, immun_resp):
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    immunization = response.json().get("entry", [])
+    allergy = orjson.loads(allergy_resp.content).get("entry", [])
+    immunization = orjson.loads(immun_resp.content).get("entry", [])
     
     return {"allergy":[entry.get("resource", {}) for entry in allergy], "immunization":[entry.get("resource", {}) for entry in immunization]}
 
 async def get_nutrition(client, headers, patient_id):
     resp = await client.get(
-        f"{FHIR_BASE_URL}/NutritionOrder?patient={patient_id}&_count=50",
+        "/NutritionOrder",
+        params={"patient": patient_id, "_count": 50},
         headers=headers
     )
     if resp.status_code != 200:
         return []
-    return resp.json().get("entry", [])
\ No newline at end of file
+    return orjson.loads(resp.content).get("entry", [])
\ No newline at end of file
@@ -1,23 +1,32 @@
-from utils.aws import call_bedrock_summary
+import asyncio
+import math
+
+from utils.aws import collect_bedrock_summary
+
+# Rough input size (in tokens) each Bedrock summary call is given
+TARGET_TOKENS_PER_CHUNK = 8000
+# Upper bound on Bedrock calls in flight for a single summary; larger inputs queue, they are not merged
+MAX_CONCURRENT_CHUNKS = 6
+
+def _approx_tokens(data) -> int:
+    # ~4 characters per token is close enough for sizing slices
+    return len(data if isinstance(data, str) else str(data)) // 4
 
 async def chunk(data,prompt_fn):
-    chunk_size = len(data) // 3
-    remainder = len(data) % 3
-    chunks = []
-    start = 0
-    # print(data, chunk_size, remainder)
-    for i in range(3):
-        end = start + chunk_size + (1 if i < remainder else 0)
-        chunks.append(data[start:end])
-        start = end
-    # print("****chunks****",chunks)
-    summary = ""
-    for idx, chunk in enumerate(chunks):
-        prompt = prompt_fn(chunk)
-        partial_summary = call_bedrock_summary(prompt) 
-        chunk_summary = ""
-        async for part in partial_summary.body_iterator:
-            chunk_summary += part
+    # Records that fit in one call are summarised once instead of being split
+    if isinstance(data, dict) or len(data) <= 1:
+        return await collect_bedrock_summary(prompt_fn(data))
+    count = min(len(data), math.ceil(_approx_tokens(data) / TARGET_TOKENS_PER_CHUNK))
+    if count <= 1:
+        return await collect_bedrock_summary(prompt_fn(data))
+    size = math.ceil(len(data) / count)
+    chunks = [data[start:start + size] for start in range(0, len(data), size)]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+
+    async def summarize(part):
+        async with semaphore:
+            return await collect_bedrock_summary(prompt_fn(part))
 
-        summary += chunk_summary
-    return summary
\ No newline at end of file
+    # The slices are summarised independently, so issue the Bedrock calls together
+    summaries = await asyncio.gather(*(summarize(part) for part in chunks))
+    return "".join(summaries)
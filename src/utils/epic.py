@@ -1,14 +1,26 @@
+import asyncio
 from fastapi import HTTPException
+import httpx
+import logging
+import orjson
 import requests
 from datetime import datetime, timezone
 
+logger = logging.getLogger(__name__)
+
 FHIR_BASE_URL = "https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4"
 
+
+async def raise_on_unauthorized(response: httpx.Response) -> None:
+    """Response hook for the Epic client: turn a 401 into HTTPStatusError so the cached token can be dropped."""
+    if response.status_code == 401:
+        response.raise_for_status()
+
 async def get_patient_info(client, headers, patient_id):
     resp = await client.get(f"{FHIR_BASE_URL}/Patient/{patient_id}", headers=headers)
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch patient info")
-    return resp.json()
+    return orjson.loads(resp.content)
 
 
 async def get_observations(client, headers, patient_id, category="vital-signs"):
@@ -18,7 +30,7 @@ async def get_observations(client, headers, patient_id, category="vital-signs"):
     resp = await client.get(url, headers=headers)
     if resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to fetch observations")
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 
 async def get_diagnostics(client, headers, patient_id):
@@ -28,7 +40,7 @@ async def get_diagnostics(client, headers, patient_id):
     )
     if resp.status_code != 200:
         return []
-    return resp.json().get("entry", [])
+    return orjson.loads(resp.content).get("entry", [])
 
 async def get_medications(client, headers, patient_id):
     url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/MedicationRequest?patient={patient_id}"
@@ -37,7 +49,7 @@ async def get_medications(client, headers, patient_id):
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch medications")
     
-    return response.json().get("entry", [])
+    return orjson.loads(response.content).get("entry", [])
 
 async def get_diagnostic_reports(client, headers, patient_id):
     url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/DiagnosticReport?patient={patient_id}"
@@ -46,7 +58,7 @@ async def get_diagnostic_reports(client, headers, patient_id):
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch diagnostic reports")
     
-    return response.json().get("entry", [])
+    return orjson.loads(response.content).get("entry", [])
 
 
 FHIR_BASE_URL_APP = "https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/Appointment"
@@ -63,15 +75,27 @@ async def get_appointments(client, headers, patient_id: str) -> dict:
         f"&_sort=date&_count=1"
     )
     goal_url=f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/Goal?patient=Patient/{patient_id}"
-    goal_resp = await client.get(goal_url, headers=headers)
-    before_resp = await client.get(before_url, headers=headers)
-    after_resp = await client.get(after_url, headers=headers)
-    if before_resp.status_code != 200 or after_resp.status_code != 200 or goal_resp.status_code != 200:
-        raise HTTPException(status_code=500, detail="Failed to fetch appointments")
-
-    before_data = before_resp.json().get("entry", [])
-    after_data = after_resp.json().get("entry", [])
-    goal_data = goal_resp.json().get("entry", [])
+    # Independent searches: issue them together, and let every request finish before judging failures
+    goal_resp, before_resp, after_resp = await asyncio.gather(
+        client.get(goal_url, headers=headers),
+        client.get(before_url, headers=headers),
+        client.get(after_url, headers=headers),
+        return_exceptions=True,
+    )
+    for name, resp in (("Goal", goal_resp), ("past Appointment", before_resp), ("upcoming Appointment", after_resp)):
+        if isinstance(resp, BaseException):
+            logger.error("Epic %s search for patient %s failed: %r", name, patient_id, resp)
+            if isinstance(resp, httpx.HTTPStatusError):
+                # Let epic_handler see the rejected token (raised by the client's 401 hook)
+                raise resp
+            raise HTTPException(status_code=500, detail="Failed to fetch appointments")
+        if resp.status_code != 200:
+            logger.error("Epic %s search for patient %s returned HTTP %s", name, patient_id, resp.status_code)
+            raise HTTPException(status_code=500, detail="Failed to fetch appointments")
+
+    before_data = orjson.loads(before_resp.content).get("entry", [])
+    after_data = orjson.loads(after_resp.content).get("entry", [])
+    goal_data = orjson.loads(goal_resp.content).get("entry", [])
 
     before_appointments = [entry.get("resource", {}) for entry in before_data]
     after_appointment = after_data[0].get("resource", {}) if after_data else {
@@ -91,10 +115,9 @@ async def get_upcoming_appointments(client, headers, patient_id: str) -> dict:
         f"&_sort=date"
     )
     after_resp = await client.get(after_url, headers=headers)
-    after_data = after_resp.json().get("entry", [])
+    after_data = orjson.loads(after_resp.content).get("entry", [])
     after_appointment = after_data[0].get("resource", {}) if after_data else {
     }
-    print(after_appointment)
     return {
         # "before_appointments": before_appointments, 
         "after_appointment": after_appointment,
@@ -110,26 +133,27 @@ async def get_current_conditions(client, headers, patient_id: str):
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    conditions = response.json().get("entry", [])
+    conditions = orjson.loads(response.content).get("entry", [])
     
     return [entry.get("resource", {}) for entry in conditions]
 
 async def get_lab_results(client, headers, patient_id: str):
     diagnostic_report_url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/DiagnosticReport?patient={patient_id}&category=laboratory"
-    diagnostic_report_response = await client.get(diagnostic_report_url, headers=headers)
+    observation_url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/Observation?patient={patient_id}&category=laboratory"
+    diagnostic_report_response, observation_response = await asyncio.gather(
+        client.get(diagnostic_report_url, headers=headers),
+        client.get(observation_url, headers=headers),
+    )
     
     if diagnostic_report_response.status_code != 200:
         raise HTTPException(status_code=diagnostic_report_response.status_code, detail="Failed to fetch diagnostic reports")
     
-    diagnostic_reports = diagnostic_report_response.json().get("entry", [])
-    
-    observation_url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/Observation?patient={patient_id}&category=laboratory"
-    observation_response = await client.get(observation_url, headers=headers)
+    diagnostic_reports = orjson.loads(diagnostic_report_response.content).get("entry", [])
     
     if observation_response.status_code != 200:
         raise HTTPException(status_code=observation_response.status_code, detail="Failed to fetch observations")
     
-    observations = observation_response.json().get("entry", [])
+    observations = orjson.loads(observation_response.content).get("entry", [])
 
     return {
         "diagnostic_reports": [entry.get("resource", {}) for entry in diagnostic_reports],
@@ -144,28 +168,25 @@ async def get_procedure(client, headers, patient_id: str):
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    conditions = response.json().get("entry", [])
+    conditions = orjson.loads(response.content).get("entry", [])
     
     return [entry.get("resource", {}) for entry in conditions]
 
 
 async def get_allergy(client, headers, patient_id: str):
     allergy_url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/AllergyIntolerance?patient={patient_id}"
-
-    response = await client.get(allergy_url, headers=headers)
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
-
-    allergy = response.json().get("entry", [])
     immun_url = f"https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4/Immunization?patient={patient_id}"
+    allergy_resp, immun_resp = await asyncio.gather(
+        client.get(allergy_url, headers=headers),
+        client.get(immun_url, headers=headers),
+    )
 
-    response = await client.get(immun_url, headers=headers)
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
+    for response in (allergy_resp, immun_resp):
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    immunization = response.json().get("entry", [])
+    allergy = orjson.loads(allergy_resp.content).get("entry", [])
+    immunization = orjson.loads(immun_resp.content).get("entry", [])
     
     return {"allergy":[entry.get("resource", {}) for entry in allergy], "immunization":[entry.get("resource", {}) for entry in immunization]}
 
@@ -177,6 +198,6 @@ async def get_nutrition(client, headers, patient_id: str):
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch conditions")
 
-    nutrition = response.json().get("entry", [])
+    nutrition = orjson.loads(response.content).get("entry", [])
     
     return [entry.get("resource", {}) for entry in nutrition]
\ No newline at end of file
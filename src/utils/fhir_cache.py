@@ -0,0 +1,39 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+# Short TTL: repeated agent calls for the same patient share upstream fetches
+FHIR_CACHE_TTL_SECONDS = 60
+FHIR_CACHE_MAXSIZE = 1024
+
+_entries: "OrderedDict[Tuple[str, str, str], Tuple[float, asyncio.Future]]" = OrderedDict()
+
+
+async def cached_fetch(kind: str, organization: str, patient_id: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the FHIR resource for (organization, patient_id, kind), fetching it at most once per TTL.
+
+    Concurrent callers for the same key wait on the same in-flight request.
+    Failed fetches are not cached.
+    """
+    key = (organization, patient_id, kind)
+    now = time.monotonic()
+
+    entry = _entries.get(key)
+    if entry is not None and entry[0] > now:
+        _entries.move_to_end(key)
+        return await asyncio.shield(entry[1])
+
+    task = asyncio.ensure_future(fetch())
+    _entries[key] = (now + FHIR_CACHE_TTL_SECONDS, task)
+    _entries.move_to_end(key)
+    while len(_entries) > FHIR_CACHE_MAXSIZE:
+        _entries.popitem(last=False)
+
+    def _evict_on_error(done: asyncio.Future) -> None:
+        if done.cancelled() or done.exception() is not None:
+            if _entries.get(key, (None, None))[1] is done:
+                del _entries[key]
+
+    task.add_done_callback(_evict_on_error)
+    return await asyncio.shield(task)
@@ -439,21 +439,28 @@ def extract_epic_medications(medications):
 
     return processed_medications
 
-def clean_fhir_data(data: str) -> dict:
-    data = re.sub(r'https?://[^\s\',"]+', '', data)  
-    data = re.sub(r'urn:oid:[^\s\',"]+', '', data) 
-    data = re.sub(r'urn:[^\s\',"]+', '', data)  
-    data = re.sub(r"'system':\s*'[^']*'", "", data)  
-    data = re.sub(r"'fullUrl':\s*'[^']*',?", "", data)  
-    data = re.sub(r"'link':\s*\[[^\]]*\],?", "", data)  
-    data = re.sub(r",\s*}", "}", data)  
-    data = re.sub(r"{\s*,", "{", data)  
-    cleaned_data = json.loads(data)
-    try:
-        cleaned_data = json.loads(data)
-    except json.JSONDecodeError:
-        cleaned_data = {}
-    return cleaned_data
+_FHIR_URI_PATTERN = re.compile(r'https?://[^\s\',"]+|urn:[^\s\',"]+')
+
+def clean_fhir_data(data):
+    """Strip URLs and URNs from every string in already-parsed FHIR data.
+
+    A JSON string is still accepted and parsed first.
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            return {}
+    return _strip_fhir_uris(data)
+
+def _strip_fhir_uris(value):
+    if isinstance(value, dict):
+        return {key: _strip_fhir_uris(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_strip_fhir_uris(item) for item in value]
+    if isinstance(value, str):
+        return _FHIR_URI_PATTERN.sub('', value)
+    return value
 
 def preprocess_procedure(procedures):
     processed_procedures = []
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from typing import Callable, Dict, Tuple
+
+from connector_fhir.epic import refresh_access_token
+
+# Refresh this many seconds before the token actually expires
+EXPIRY_BUFFER_SECONDS = 60
+# Used when the token response carries no expires_in
+DEFAULT_TOKEN_TTL_SECONDS = 3600
+
+_tokens: Dict[Tuple[Callable, str], Tuple[str, float]] = {}
+_locks: Dict[Tuple[Callable, str], asyncio.Lock] = {}
+
+
+async def get_access_token(organization: str, refresh_fn: Callable[[str], dict] = refresh_access_token) -> str:
+    """Return a cached access token for the organization, refreshing it off the event loop when near expiry."""
+    key = (refresh_fn, organization)
+    cached = _tokens.get(key)
+    if cached and cached[1] - time.time() > EXPIRY_BUFFER_SECONDS:
+        return cached[0]
+
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Another request may have refreshed while we waited
+        cached = _tokens.get(key)
+        if cached and cached[1] - time.time() > EXPIRY_BUFFER_SECONDS:
+            return cached[0]
+
+        loop = asyncio.get_running_loop()
+        tokens = await loop.run_in_executor(None, refresh_fn, organization)
+        access_token = tokens["access_token"]
+        expires_in = tokens.get("expires_in") or DEFAULT_TOKEN_TTL_SECONDS
+        _tokens[key] = (access_token, time.time() + float(expires_in))
+        return access_token
+
+
+def invalidate(organization: str, refresh_fn: Callable[[str], dict] = refresh_access_token) -> None:
+    """Forget the cached token so the next get_access_token() refreshes it (e.g. after a 401)."""
+    _tokens.pop((refresh_fn, organization), None)
@@ -2,7 +2,9 @@
 
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from main import app
+from services import schema_extraction_service
+from utils import fhir_cache, token_cache
 
 
 @pytest.fixture
@@ -24,3 +26,29 @@ def sample_connection_data():
         "password": "test_password",
         "additional_notes": "Test connection for unit tests"
     }
+
+
+@pytest.fixture
+def empty_token_cache():
+    """Clear cached FHIR access tokens before and after the test."""
+    token_cache._tokens.clear()
+    token_cache._locks.clear()
+    yield
+    token_cache._tokens.clear()
+    token_cache._locks.clear()
+
+
+@pytest.fixture
+def empty_fhir_cache():
+    """Clear cached FHIR reads before and after the test."""
+    fhir_cache._entries.clear()
+    yield
+    fhir_cache._entries.clear()
+
+
+@pytest.fixture
+def empty_schema_cache():
+    """Clear cached database schemas before and after the test."""
+    schema_extraction_service._schema_cache.clear()
+    yield
+    schema_extraction_service._schema_cache.clear()
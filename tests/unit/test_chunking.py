@@ -0,0 +1,83 @@
+"""Test cases for splitting FHIR data across Bedrock summary calls."""
+
+import pytest
+
+from utils import chunking
+from utils.chunking import chunk
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Record every prompt sent to Bedrock and answer with a fixed-format summary."""
+    sent = []
+
+    async def fake_collect(prompt):
+        sent.append(prompt)
+        return f"<{len(sent)}>"
+
+    monkeypatch.setattr(chunking, "collect_bedrock_summary", fake_collect)
+    return sent
+
+
+def identity_prompt(data):
+    return data
+
+
+def records(count, chars_each):
+    """count records whose repr is roughly chars_each characters long."""
+    return ["x" * chars_each for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_dict_is_summarised_in_one_call(prompts):
+    data = {"resourceType": "Patient", "id": "p1"}
+    assert await chunk(data, identity_prompt) == "<1>"
+    assert prompts == [data]
+
+
+@pytest.mark.asyncio
+async def test_single_record_is_summarised_in_one_call(prompts):
+    data = records(1, 100_000)
+    await chunk(data, identity_prompt)
+    assert prompts == [data]
+
+
+@pytest.mark.asyncio
+async def test_small_input_below_target_is_not_split(prompts):
+    # ~10 * 1000 chars is well under TARGET_TOKENS_PER_CHUNK * 4 characters
+    data = records(10, 1000)
+    await chunk(data, identity_prompt)
+    assert prompts == [data]
+
+
+@pytest.mark.asyncio
+async def test_large_input_is_split_by_token_target(prompts):
+    # Each record renders as 2000 tokens in str(list) (quotes and ", " included), so 40 records
+    # make ~10 target-sized slices of 4 records each
+    data = records(40, chunking.TARGET_TOKENS_PER_CHUNK - 4)
+
+    result = await chunk(data, identity_prompt)
+
+    expected_count = -(-chunking._approx_tokens(data) // chunking.TARGET_TOKENS_PER_CHUNK)
+    assert len(prompts) == expected_count
+    assert [record for part in prompts for record in part] == data
+    assert all(chunking._approx_tokens(part) <= chunking.TARGET_TOKENS_PER_CHUNK for part in prompts)
+    assert result == "".join(f"<{i}>" for i in range(1, expected_count + 1))
+
+
+@pytest.mark.asyncio
+async def test_slice_count_is_not_capped_by_concurrency_limit(prompts):
+    data = records(chunking.MAX_CONCURRENT_CHUNKS * 4, chunking.TARGET_TOKENS_PER_CHUNK * 4)
+
+    await chunk(data, identity_prompt)
+
+    # Each record alone fills a slice, so every record gets its own call
+    assert len(prompts) == len(data)
+
+
+@pytest.mark.asyncio
+async def test_string_input_is_sliced_by_characters(prompts):
+    data = "y" * (chunking.TARGET_TOKENS_PER_CHUNK * 4 * 3)
+    await chunk(data, identity_prompt)
+    assert "".join(prompts) == data
+    assert len(prompts) == 3
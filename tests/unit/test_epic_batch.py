@@ -0,0 +1,64 @@
+"""Test cases for the Epic batch summary endpoint."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from api import epic_router
+from core.config import settings
+
+
+async def fake_summary(patient_id: str, organization: str, client):
+    """Stream a per-patient summary; earlier patients finish last to exercise result ordering."""
+    await asyncio.sleep(0.01 * (3 - int(patient_id[-1])))
+    if patient_id == "p2":
+        raise HTTPException(status_code=500, detail="Summary generation failed")
+    return StreamingResponse(iter([f"summary for {patient_id} ", organization]), media_type="text/plain")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Client for an app with only the Epic router and a stubbed agent."""
+    monkeypatch.setitem(epic_router.BATCH_AGENTS, "patient", fake_summary)
+    app = FastAPI()
+    app.include_router(epic_router.router)
+    app.dependency_overrides[epic_router.get_epic_client] = lambda: None
+    return TestClient(app)
+
+
+def test_batch_returns_results_in_request_order(client):
+    """Results follow the order of patient_ids, not completion order."""
+    response = client.post("/epic-batch/patient/org", json={"patient_ids": ["p1", "p3"]})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"patient_id": "p1", "summary": "summary for p1 org"},
+        {"patient_id": "p3", "summary": "summary for p3 org"},
+    ]
+
+
+def test_batch_reports_failing_patient_without_failing_batch(client):
+    """One failing patient gets an error entry; the others still get summaries."""
+    response = client.post("/epic-batch/patient/org", json={"patient_ids": ["p1", "p2", "p3"]})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"patient_id": "p1", "summary": "summary for p1 org"},
+        {"patient_id": "p2", "error": "Summary generation failed"},
+        {"patient_id": "p3", "summary": "summary for p3 org"},
+    ]
+
+
+def test_batch_unknown_agent_returns_404(client):
+    """An agent name outside BATCH_AGENTS is rejected."""
+    response = client.post("/epic-batch/not-an-agent/org", json={"patient_ids": ["p1"]})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Unknown agent: not-an-agent"
+
+
+@pytest.mark.parametrize("count", [0, settings.EPIC_BATCH_MAX_PATIENTS + 1])
+def test_batch_size_is_bounded(client, count):
+    """Empty batches and batches above EPIC_BATCH_MAX_PATIENTS fail validation."""
+    response = client.post("/epic-batch/patient/org", json={"patient_ids": [f"p{i}" for i in range(count)]})
+    assert response.status_code == 422
@@ -0,0 +1,123 @@
+"""Test cases for the FHIR read cache."""
+
+import asyncio
+
+import pytest
+
+from utils import fhir_cache
+from utils.fhir_cache import cached_fetch
+
+
+@pytest.mark.asyncio
+async def test_cached_fetch_reuses_result_within_ttl(empty_fhir_cache):
+    """Test that a second call inside the TTL is served from the cache."""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "bundle"
+
+    assert await cached_fetch("patient", "org", "p1", fetch) == "bundle"
+    assert await cached_fetch("patient", "org", "p1", fetch) == "bundle"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_fetch_refetches_after_ttl(empty_fhir_cache, monkeypatch):
+    """Test that entries older than the TTL are fetched again."""
+    now = [1000.0]
+    monkeypatch.setattr(fhir_cache.time, "monotonic", lambda: now[0])
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "bundle"
+
+    await cached_fetch("patient", "org", "p1", fetch)
+    now[0] += fhir_cache.FHIR_CACHE_TTL_SECONDS + 1
+    await cached_fetch("patient", "org", "p1", fetch)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_fetch_keys_on_kind_organization_and_patient(empty_fhir_cache):
+    """Test that different resources, organizations or patients never share an entry."""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "bundle"
+
+    await cached_fetch("patient", "org", "p1", fetch)
+    await cached_fetch("conditions", "org", "p1", fetch)
+    await cached_fetch("patient", "other-org", "p1", fetch)
+    await cached_fetch("patient", "org", "p2", fetch)
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch(empty_fhir_cache):
+    """Test that callers arriving while a fetch is in flight wait on the same request."""
+    release = asyncio.Event()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return "bundle"
+
+    waiters = [asyncio.ensure_future(cached_fetch("patient", "org", "p1", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ["bundle"] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_not_cached(empty_fhir_cache):
+    """Test that an exception reaches the caller and the next call fetches again."""
+    async def failing():
+        raise RuntimeError("FHIR unavailable")
+
+    async def fetch():
+        return "bundle"
+
+    with pytest.raises(RuntimeError):
+        await cached_fetch("patient", "org", "p1", failing)
+    assert ("org", "p1", "patient") not in fhir_cache._entries
+    assert await cached_fetch("patient", "org", "p1", fetch) == "bundle"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_fetch_is_evicted(empty_fhir_cache):
+    """Test that a cancelled fetch does not leave a poisoned entry behind."""
+    started = asyncio.Event()
+
+    async def hanging():
+        started.set()
+        await asyncio.sleep(3600)
+
+    waiter = asyncio.ensure_future(cached_fetch("patient", "org", "p1", hanging))
+    await started.wait()
+    _, task = fhir_cache._entries[("org", "p1", "patient")]
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.sleep(0)
+    assert ("org", "p1", "patient") not in fhir_cache._entries
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_by_maxsize(empty_fhir_cache, monkeypatch):
+    """Test that the least recently used entry is dropped once maxsize is exceeded."""
+    monkeypatch.setattr(fhir_cache, "FHIR_CACHE_MAXSIZE", 2)
+
+    async def fetch():
+        return "bundle"
+
+    await cached_fetch("patient", "org", "p1", fetch)
+    await cached_fetch("patient", "org", "p2", fetch)
+    await cached_fetch("patient", "org", "p1", fetch)
+    await cached_fetch("patient", "org", "p3", fetch)
+
+    assert list(fhir_cache._entries) == [("org", "p1", "patient"), ("org", "p3", "patient")]
@@ -0,0 +1,98 @@
+"""Test cases for the FHIR access-token cache."""
+
+import asyncio
+
+import pytest
+
+from utils import token_cache
+from utils.token_cache import get_access_token, invalidate
+
+
+@pytest.mark.asyncio
+async def test_token_is_reused_until_expiry_buffer(empty_token_cache, monkeypatch):
+    """Test that a token is cached until it is within the expiry buffer."""
+    now = [1000.0]
+    monkeypatch.setattr(token_cache.time, "time", lambda: now[0])
+    calls = []
+
+    def refresh(organization):
+        calls.append(organization)
+        return {"access_token": f"token-{len(calls)}", "expires_in": 600}
+
+    assert await get_access_token("org", refresh) == "token-1"
+    now[0] += 600 - token_cache.EXPIRY_BUFFER_SECONDS - 1
+    assert await get_access_token("org", refresh) == "token-1"
+    now[0] += 1
+    assert await get_access_token("org", refresh) == "token-2"
+
+
+@pytest.mark.asyncio
+async def test_missing_expires_in_uses_default_ttl(empty_token_cache, monkeypatch):
+    """Test that a token response without expires_in gets the default TTL."""
+    now = [1000.0]
+    monkeypatch.setattr(token_cache.time, "time", lambda: now[0])
+    calls = []
+
+    def refresh(organization):
+        calls.append(organization)
+        return {"access_token": f"token-{len(calls)}"}
+
+    await get_access_token("org", refresh)
+    now[0] += token_cache.DEFAULT_TOKEN_TTL_SECONDS - token_cache.EXPIRY_BUFFER_SECONDS - 1
+    await get_access_token("org", refresh)
+    assert len(calls) == 1
+
+    now[0] += 1
+    await get_access_token("org", refresh)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_trigger_single_refresh(empty_token_cache):
+    """Test that callers racing on an empty cache share one refresh."""
+    calls = []
+
+    def refresh(organization):
+        calls.append(organization)
+        return {"access_token": "token-1", "expires_in": 3600}
+
+    tokens = await asyncio.gather(*(get_access_token("org", refresh) for _ in range(10)))
+
+    assert tokens == ["token-1"] * 10
+    assert calls == ["org"]
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_cached_per_organization_and_refresh_fn(empty_token_cache):
+    """Test that organizations and EHR vendors never share a token."""
+    epic_calls = []
+    cerner_calls = []
+
+    def refresh_epic(organization):
+        epic_calls.append(organization)
+        return {"access_token": "epic", "expires_in": 3600}
+
+    def refresh_cerner(organization):
+        cerner_calls.append(organization)
+        return {"access_token": "cerner", "expires_in": 3600}
+
+    await get_access_token("org-a", refresh_epic)
+    await get_access_token("org-b", refresh_epic)
+    assert await get_access_token("org-a", refresh_cerner) == "cerner"
+
+    assert epic_calls == ["org-a", "org-b"]
+    assert cerner_calls == ["org-a"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_refresh(empty_token_cache):
+    """Test that an invalidated token is refreshed even if it has not expired."""
+    calls = []
+
+    def refresh(organization):
+        calls.append(organization)
+        return {"access_token": f"token-{len(calls)}", "expires_in": 3600}
+
+    assert await get_access_token("org", refresh) == "token-1"
+    invalidate("org", refresh)
+    assert await get_access_token("org", refresh) == "token-2"